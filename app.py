@@ -16,12 +16,21 @@ Usage:
     streamlit run app.py
 """
 
+import logging
+import os
+
 import streamlit as st
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Diagnostics go through logging; set LOG_LEVEL=DEBUG for verbose output
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
 # Import our modules
 from src.config import Config
 from src.data_loader import DataLoader
@@ -67,7 +76,8 @@ def main():
                     st.code(ai_components.last_error)
             st.stop()
         
-        vectorstore = ai_components.create_vector_store(documents, embeddings)
+        data_fingerprint = data_loader.source_fingerprint()
+        vectorstore = ai_components.create_vector_store(documents, embeddings, data_fingerprint)
         if vectorstore is None:
             st.error("Unable to create search index. Please try again.")
             if getattr(ai_components, "last_error", None):
@@ -83,7 +93,7 @@ def main():
                     st.code(ai_components.last_error)
             st.stop()
         
-        ai_chain, retriever = ai_components.create_ai_chain(vectorstore, llm)
+        ai_chain, retriever = ai_components.create_ai_chain(vectorstore, llm, data_fingerprint)
         if ai_chain is None:
             st.error("Unable to initialize chat system. Please try again.")
             if getattr(ai_components, "last_error", None):
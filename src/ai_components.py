@@ -3,19 +3,377 @@ AI components module for the AI Asset Management Chatbot.
 Handles embeddings, vector store, LLM, and AI chain creation.
 """
 
+import faiss
+import hashlib
+import json
+import logging
+import numpy as np
 import streamlit as st
+import uuid
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple, Any
+from typing import List, Optional, Tuple, Any
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_groq import ChatGroq
 from langchain_core.documents import Document
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
 import re
 
 
+logger = logging.getLogger(__name__)
+
+# Common misspellings/compound words rewritten before retrieval
+_NORMALIZATION_MAP = {
+    "assests": "assets",
+    "assest": "asset",
+    "workorder": "work order",
+    "workorders": "work orders",
+    "purchaseorder": "purchase order",
+    "purchaseorders": "purchase orders",
+    "customers": "customer",
+    "vendors": "vendor",
+    "invoices": "invoice",
+    "employees": "employee",
+    "parts": "part",
+    "serviceitems": "service item"
+}
+# Longest alternatives first so one left-to-right pass matches the old sequential replaces.
+# No \b anchors: the replaces were substring-based, so "myworkorders" must still be rewritten.
+_NORMALIZATION_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(_NORMALIZATION_MAP, key=len, reverse=True))
+)
+
+_COUNT_KEYWORDS = ["how many", "count", "total", "number of", "amount of"]
+_LIST_KEYWORDS = [
+    "list all", "show all", "show me all", "all customers", "all vendors", "all employees", "all assets",
+    "list customers", "list customer", "customers list", "customer list", "list customer details", "customer details",
+    "show customers", "show customer details", "get customers", "display customers"
+]
+_COUNT_QUERY_RE = re.compile("|".join(map(re.escape, _COUNT_KEYWORDS)))
+_LIST_QUERY_RE = re.compile("|".join(map(re.escape, _LIST_KEYWORDS)))
+
+# Summary documents looked up directly by id rather than retrieved
+_SUMMARY_DOC_TYPES = ("global_summary", "customers_summary")
+
+# Index types whose stored vectors reconstruct exactly enough to reuse across rebuilds
+_EXACT_INDEX_TYPES = ("flat", "hnsw", "fp16")
+
+# VECTOR_INDEX_TYPE values backed by faiss.IndexScalarQuantizer
+_SCALAR_QUANTIZER_TYPES = {
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+}
+
+# Output sanitation patterns, compiled once instead of per response
+_CONTACTKEY_VALUE_RE = re.compile(r"\bcontactKey\s*:\s*\d+")
+_CONTACTKEY_LABEL_RE = re.compile(r"(?i)\bcontactKey\b")
+# A trailing key whose value may still arrive on a later line (\s* in the value pattern spans newlines)
+_CONTACTKEY_OPEN_RE = re.compile(r"\bcontactKey\s*(?::\s*)?\Z")
+_SPACES_RE = re.compile(r" {2,}")
+_CONCLUSION_RE = re.compile("|".join([
+    r'The (?:entity|company|organization|business).+',
+    r'In conclusion.+',
+    r'Therefore.+',
+    r'As (?:a result|shown).+',
+]))
+
+
+# Static prompt sections; only history, question and context vary per query
+_PROMPT_HEADER = (
+    "You are a senior data analyst specializing in asset management and maintenance operations. "
+    "You analyze complex business data to provide actionable insights.\n\n"
+
+    "## Data Structure:\n"
+    "All documents are prefixed with 'DOC: [TYPE]' where TYPE indicates the record type.\n"
+    "Available types: ASSET, WORK ORDER, CUSTOMER, VENDOR, INVOICE, PURCHASE ORDER, "
+    "EMPLOYEE, PART, SERVICE ITEM, WORK TYPE, WORK PRIORITY, etc.\n"
+    "GLOBAL SUMMARY documents contain aggregate counts, totals, and statistical breakdowns.\n\n"
+
+    "## Entity Relationships:\n"
+    "- Assets are linked to Customers and have Work Orders\n"
+    "- Work Orders generate Invoices and link to Employees\n"
+    "- Vendors supply Purchase Orders and Parts\n"
+    "- Invoices can originate from Work Orders and link to Customers\n"
+    "- All entities can have Custom Fields with additional metadata\n\n"
+)
+
+_PROMPT_GUIDELINES = (
+    "## Response Style (Concise & Structured):\n"
+    "- Default to brevity; keep under 6 lines unless asked for more.\n"
+    "- Answer only what is asked. No extra context or preamble.\n"
+    "- Organize with short headings (use '###') and bullets.\n"
+    "- Prefer lists/tables over paragraphs.\n"
+    "- Put key numbers first and make them **bold**.\n"
+    "- If information is missing, state it in one line, then ask one targeted follow-up.\n"
+    "- For long lists (>20 items), ask for confirmation before listing all.\n"
+    "- Never repeat the question or include source citations.\n\n"
+
+    "## Language Behavior:\n"
+    "- Respond in the user's requested language when specified.\n"
+    "- If the user says to 'tell the previous details again in Japanese' (e.g., '日本語で', 'Japanese'),\n"
+    "  then re-state the last assistant answer translated into natural Japanese, preserving structure, counts, and items exactly.\n"
+    "- Do not re-analyze or change numbers/content; only translate and adapt headings/bullets to Japanese.\n"
+    "- Use concise Japanese, with short headings and bullets.\n\n"
+
+    "## Analytical Response Guidelines:\n"
+    "1. Count Queries (how many, count, total):\n"
+    "   - Prefer GLOBAL SUMMARY when present.\n"
+    "   - Extract exact numbers only.\n"
+    "   - Answer with just the metric; key number first and **bold**.\n"
+    "   - Keep it to a single bullet unless more detail is requested.\n\n"
+
+    "2. List Queries (list all, show all):\n"
+    "   - Return bullets only, no commentary.\n"
+    "   - Prefer authoritative summary docs when present.\n"
+    "   - Include human-readable identifiers only (e.g., name, id, email, status).\n"
+    "   - Exclude internal keys (e.g., contactKey, customerKey, vendorKey, addressKey, phoneKey).\n"
+    "   - Use 'Name – id, email, status' inline format; use '-' for missing fields.\n"
+    "   - If total N is stated, output exactly N items.\n"
+    "   - If N > 20, first ask: 'Show all N?' and wait unless user confirms.\n"
+    "   - One item per line starting with '- '.\n\n"
+
+    "3. Aggregations (sum, average, min, max, median, group by):\n"
+    "   - Calculate strictly from the provided context; do not invent values.\n"
+    "   - State units and currency when known.\n"
+    "   - Show a one-line formula summary when non-trivial.\n"
+    "   - When grouping, present a compact table: group, count, sum, avg as relevant.\n"
+    "   - Keep to 3-5 bullets unless asked for more.\n"
+    "   - Handle missing values by excluding nulls unless the user requests otherwise.\n\n"
+
+    "4. Analytics (trends, outliers, distributions, comparisons):\n"
+    "   - Base insights only on data in context.\n"
+    "   - Identify top contributors and anomalies with simple metrics.\n"
+    "   - If a time range is implied, state the range detected from the data.\n"
+    "   - Keep insights to 3 to 5 tight bullets unless asked for more.\n\n"
+
+    "5. Detail Queries (tell me about, details of):\n"
+    "   - Extract comprehensive information from DOC entries.\n"
+    "   - Include related entities only if asked.\n"
+    "   - Never expose internal keys; omit fields ending with 'Key' (e.g., contactKey).\n\n"
+
+
+    "## General Rules:\n"
+    "- Use exact numbers from context; include units and currency when known.\n"
+    "- Do not hallucinate fields or records; if data is insufficient, say what is missing.\n"
+    "- Include only human-readable IDs where relevant (assetId, workOrderNumber, invoiceNumber, customerId, vendorId).\n"
+    "- Do NOT include internal numeric keys (e.g., contactKey, customerKey, vendorKey, addressKey, phoneKey).\n"
+    "- No recommendations unless asked.\n\n"
+
+    "CRITICAL FORMATTING RULES:\n"
+    "- Start responses immediately; no preambles or sources.\n"
+    "- One bullet per line, starting with '- '.\n"
+    "- Use short '###' headings when helpful.\n"
+    "- Keep under 6 lines by default; ask to expand if needed.\n\n"
+
+    "Remember: Be concise, structured, and grounded only in the provided documents."
+)
+
+# Fixed separators folded in once, so each prompt joins only the varying pieces
+_PROMPT_PREFIX = _PROMPT_HEADER + "CONVERSATION HISTORY:\n"
+_PROMPT_QUESTION = "\n\nCURRENT QUESTION: "
+_PROMPT_SUFFIX = "\n\n" + _PROMPT_GUIDELINES
+
+
+class RAGChain:
+    """Retrieval-augmented chat chain over the asset vector store."""
+
+    __slots__ = (
+        "llm", "retriever", "vectorstore", "_context_header",
+        "_global_summary", "_customers_summary", "_retrieve",
+    )
+
+    def __init__(self, llm, retriever, vectorstore, k: int, retrieval_cache_size: int = 0):
+        self.llm = llm
+        self.retriever = retriever
+        self.vectorstore = vectorstore
+        self._context_header = f"\n\nAVAILABLE DATA (showing top {k} relevant documents):\n"
+        # Repeated (normalized) questions skip query embedding and the ANN search
+        self._retrieve = (
+            lru_cache(maxsize=retrieval_cache_size)(self._retrieve_uncached)
+            if retrieval_cache_size > 0 else self._retrieve_uncached
+        )
+        # Summary documents never change after indexing, so locate them once
+        self.refresh_summaries()
+
+    def refresh_summaries(self):
+        """Re-locate the global and customers summary documents; call after the docstore changes."""
+        self._global_summary = None
+        self._customers_summary = None
+        try:
+            store = getattr(self.vectorstore, "docstore", None)
+            mapping = getattr(store, "_dict", {}) if store else {}
+            # Indexes built by _build_vector_store store summaries under their doc_type
+            global_doc = mapping.get("global_summary")
+            customers_doc = mapping.get("customers_summary")
+            if isinstance(global_doc, Document) and isinstance(customers_doc, Document):
+                self._global_summary = global_doc.page_content
+                self._customers_summary = customers_doc.page_content
+                return
+            for doc in mapping.values():
+                if isinstance(doc, Document):
+                    if doc.metadata.get("doc_type") == "global_summary":
+                        self._global_summary = doc.page_content
+                    elif doc.metadata.get("doc_type") == "customers_summary":
+                        self._customers_summary = doc.page_content
+                    if self._global_summary is not None and self._customers_summary is not None:
+                        break
+        except Exception:
+            pass
+
+    def _retrieve_uncached(self, qnorm: str) -> Tuple[Document, ...]:
+        """Run the retriever for a normalized question; tuples keep cached results immutable."""
+        return tuple(self.retriever.invoke(qnorm))
+
+    def reset_cache(self):
+        """Drop memoized retrievals, e.g. after the vector store is rebuilt."""
+        if hasattr(self._retrieve, "cache_clear"):
+            self._retrieve.cache_clear()
+
+    @staticmethod
+    def _message_text(message) -> str:
+        """Return a chat message's text; getattr's default would build str(message) on every call."""
+        content = getattr(message, "content", None)
+        return content if content is not None else str(message)
+
+    @staticmethod
+    def _strip_internal_keys(text: str) -> str:
+        """Remove internal keys such as contactKey from LLM output."""
+        # Remove explicit 'contactKey: <number>' patterns, then standalone 'contactKey' labels
+        return _CONTACTKEY_LABEL_RE.sub("", _CONTACTKEY_VALUE_RE.sub("", text))
+
+    @staticmethod
+    def _sanitize_output(text: str) -> str:
+        """Remove internal keys such as contactKey from LLM output and fix formatting."""
+        if not isinstance(text, str):
+            return text
+        text = RAGChain._strip_internal_keys(text)
+
+        result_lines = []
+        prev_was_list_item = False
+        for line in text.split('\n'):
+            # Fix bullet point formatting - ensure each bullet is on its own line
+            # Pattern: "Name: value - Name2: value2" but not "Name - value" (which is single item)
+            if line.count(' - ') > 1 or (' - ' in line and line.count(':') >= 2):
+                parts = [p for p in (part.strip() for part in line.split(' - ')) if p and not p.startswith('- ')]
+            else:
+                parts = (line,)
+
+            for part in parts:
+                stripped = part.strip()
+                # Add blank line before conclusion sentences that follow a list
+                if prev_was_list_item and _CONCLUSION_RE.match(stripped):
+                    result_lines.append('')
+                result_lines.append(part)
+                # List items look like "Name: number"
+                prev_was_list_item = bool(
+                    stripped and ':' in part and
+                    any(char.isdigit() for char in part) and
+                    not stripped.startswith(('#', 'The ', '- '))
+                )
+
+        # Minimal cleanup - preserve structure
+        return _SPACES_RE.sub(' ', '\n'.join(result_lines)).strip()
+
+    def _prepare(self, question: str, conversation_history: str):
+        """Normalize the question, retrieve context and build the LLM prompt."""
+        # Comprehensive normalization for common misspellings (single regex pass)
+        qnorm = _NORMALIZATION_RE.sub(
+            lambda m: _NORMALIZATION_MAP[m.group(0)], (question or "").lower()
+        )
+
+        # Detect query intent for intelligent retrieval
+        is_count_query = _COUNT_QUERY_RE.search(qnorm) is not None
+
+        # Detect list queries for special handling (broadened)
+        is_list_query = _LIST_QUERY_RE.search(qnorm) is not None
+
+        # Use normalized query for retrieval (LangChain >= 0.1.46)
+        docs = self._retrieve(qnorm)
+
+        # Always include summary documents if present for intelligent retrieval
+        global_summary_content = self._global_summary
+        customers_summary_content = self._customers_summary
+        # Track summaries by doc_type so placement needs no full-text comparisons
+        retrieved_types = {d.metadata.get("doc_type") for d in docs}
+        has_global_summary = "global_summary" in retrieved_types
+        lead_with_customers = bool(
+            is_list_query and customers_summary_content and "customer" in qnorm
+        )
+        parts = [
+            d.page_content for d in docs
+            if not (lead_with_customers and d.metadata.get("doc_type") == "customers_summary")
+        ]
+
+        # For count queries, ALWAYS prioritize global summary at the TOP
+        if is_count_query and global_summary_content:
+            parts.insert(0, global_summary_content)
+            # Also append it at the end as backup to ensure it's in context
+            if not has_global_summary:
+                parts.append(global_summary_content)
+
+        # For list queries, prioritize relevant summary documents and ensure they are first
+        if lead_with_customers:
+            parts.insert(0, customers_summary_content)
+
+        # For general queries, include global summary at the end for context
+        if not is_count_query and global_summary_content and not has_global_summary:
+            parts.append(global_summary_content)
+
+        context = "\n\n---\n\n".join(parts)
+        prompt = "".join([
+            _PROMPT_PREFIX, conversation_history or "No previous conversation.",
+            _PROMPT_QUESTION, qnorm,
+            self._context_header, context,
+            _PROMPT_SUFFIX,
+        ])
+        return prompt
+
+    def invoke(self, question: str, conversation_history: str = ""):
+        try:
+            prompt = self._prepare(question, conversation_history)
+            response = self.llm.invoke(prompt)
+            raw = self._message_text(response)
+            return self._sanitize_output(raw)
+        except Exception as e:
+            logger.exception("Error in RAGChain.invoke: %s", e)
+            return f"Error processing request: {str(e)}"
+
+    def stream(self, question: str, conversation_history: str = ""):
+        """Yield the answer line by line as the LLM generates it.
+
+        Internal keys are stripped per completed line. A line ending in a contactKey
+        label is held back until its value arrives, because 'contactKey: <number>'
+        may be split by a line break. Pass the concatenated text to format_answer
+        for the final layout.
+        """
+        try:
+            prompt = self._prepare(question, conversation_history)
+            pending = ""
+            for chunk in self.llm.stream(prompt):
+                text = self._message_text(chunk)
+                pending += text
+                if "\n" in pending:
+                    complete, pending = pending.rsplit("\n", 1)
+                    complete += "\n"
+                    open_key = _CONTACTKEY_OPEN_RE.search(complete)
+                    if open_key:
+                        complete, pending = complete[:open_key.start()], complete[open_key.start():] + pending
+                    if complete:
+                        yield self._strip_internal_keys(complete)
+            if pending:
+                yield self._strip_internal_keys(pending)
+        except Exception as e:
+            logger.exception("Error in RAGChain.stream: %s", e)
+            yield f"Error processing request: {str(e)}"
+
+    def format_answer(self, text: str) -> str:
+        """Apply the final output cleanup to streamed text."""
+        return self._sanitize_output(text)
+
+
 class AIComponents:
     """Handles all AI-related components and operations."""
     
@@ -23,16 +381,104 @@ class AIComponents:
         """Initialize AI components with configuration."""
         self.config = config
         self.last_error: Optional[str] = None
+        # SIMD level of the loaded FAISS build (e.g. AVX2/AVX512), shown in diagnostics
+        self.faiss_compile_options = faiss.get_compile_options()
+        faiss.omp_set_num_threads(max(1, config.FAISS_NUM_THREADS))
     
+    def _quantized_embedding_kwargs(self) -> Optional[dict]:
+        """Export (once) an int8-quantized ONNX copy of the embedding model and return its load kwargs."""
+        try:
+            import onnxruntime as ort
+            from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+            target = Path(self.config.EMBEDDING_QUANTIZED_PATH)
+            file_name = f"onnx/model_qint8_{self.config.EMBEDDING_QUANTIZE_CONFIG}.onnx"
+            if not (target / file_name).exists():
+                model = SentenceTransformer(self.config.EMBEDDING_MODEL, backend="onnx", device="cpu")
+                model.save_pretrained(str(target))
+                export_dynamic_quantized_onnx_model(model, self.config.EMBEDDING_QUANTIZE_CONFIG, str(target))
+
+            # Fuse graph ops at load time and size the intra-op pool explicitly
+            session_options = ort.SessionOptions()
+            session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            session_options.intra_op_num_threads = max(1, self.config.EMBEDDING_NUM_THREADS)
+            return {
+                "model_name": str(target),
+                "model_kwargs": {
+                    'device': 'cpu',
+                    'backend': 'onnx',
+                    'model_kwargs': {
+                        'file_name': file_name,
+                        'provider': 'CPUExecutionProvider',
+                        'session_options': session_options,
+                    },
+                },
+            }
+        except Exception as e:
+            logger.warning("Quantized ONNX embeddings unavailable, using FP32 model: %s", e)
+            return None
+
+    @staticmethod
+    def _compile_embedding_model(embeddings: HuggingFaceEmbeddings):
+        """JIT-compile the transformer behind the embeddings; keeps eager mode if compilation is unavailable."""
+        try:
+            import torch
+
+            transformer = embeddings.client[0]
+            # Sequence lengths vary per batch, so trace with dynamic shapes to avoid recompiles
+            transformer.auto_model = torch.compile(transformer.auto_model, dynamic=True)
+        except Exception as e:
+            logger.warning("torch.compile unavailable for embeddings, using eager mode: %s", e)
+
     @st.cache_resource
     def load_embeddings(_self) -> Optional[HuggingFaceEmbeddings]:
-        """Load HuggingFace embeddings model."""
+        """Load HuggingFace embeddings model (int8 ONNX when EMBEDDING_QUANTIZE is set)."""
         try:
-            # Use HuggingFace embeddings directly
-            embeddings = HuggingFaceEmbeddings(
-                model_name=_self.config.EMBEDDING_MODEL,
-                model_kwargs={'device': 'cpu'}
-            )
+            embedding_kwargs = None
+            if _self.config.EMBEDDING_QUANTIZE:
+                embedding_kwargs = _self._quantized_embedding_kwargs()
+            requested_sdpa = embedding_kwargs is None
+            if requested_sdpa:
+                import torch
+
+                # Size torch's CPU pools explicitly; some hosts start with a single-thread default
+                torch.set_num_threads(max(1, _self.config.EMBEDDING_NUM_THREADS))
+                try:
+                    torch.set_num_interop_threads(2)
+                except RuntimeError:
+                    pass  # Only settable before the first parallel op in the process
+
+                # Fused scaled-dot-product attention (what BetterTransformer provided, now built in);
+                # half precision only pays off on GPU tensor cores
+                model_kwargs = {'device': 'cpu', 'model_kwargs': {'attn_implementation': 'sdpa'}}
+                if torch.cuda.is_available():
+                    model_kwargs = {
+                        'device': 'cuda',
+                        'model_kwargs': {'torch_dtype': torch.float16, 'attn_implementation': 'sdpa'},
+                    }
+                embedding_kwargs = {
+                    "model_name": _self.config.EMBEDDING_MODEL,
+                    "model_kwargs": model_kwargs,
+                }
+
+            # Use HuggingFace embeddings directly; unit-length vectors make inner product a cosine score
+            encode_kwargs = {
+                'batch_size': _self.config.EMBEDDING_BATCH_SIZE,
+                'normalize_embeddings': True,
+                'convert_to_numpy': True,
+            }
+            try:
+                embeddings = HuggingFaceEmbeddings(**embedding_kwargs, encode_kwargs=encode_kwargs)
+            except (TypeError, ValueError) as e:
+                # sentence-transformers < 3.0 (or an older transformers) rejects the nested
+                # model_kwargs; fall back to default attention rather than failing to start
+                if not requested_sdpa:
+                    raise
+                logger.warning("SDPA attention unavailable for embeddings, using defaults: %s", e)
+                embedding_kwargs["model_kwargs"].pop('model_kwargs')
+                embeddings = HuggingFaceEmbeddings(**embedding_kwargs, encode_kwargs=encode_kwargs)
+            if _self.config.EMBEDDING_TORCH_COMPILE and not _self.config.EMBEDDING_QUANTIZE:
+                _self._compile_embedding_model(embeddings)
             return embeddings
         except Exception as e:
             import traceback
@@ -42,32 +488,200 @@ class AIComponents:
                 f"Error: {e}\n"
                 f"Traceback:\n{traceback.format_exc()}"
             )
-            print(_self.last_error)
+            logger.error(_self.last_error)
             return None
     
+    def _index_fingerprint(self, documents: list) -> dict:
+        """Identify the embedding model and document set a persisted index was built from."""
+        digest = hashlib.blake2b(digest_size=16)
+        for doc in documents or []:
+            digest.update(doc.page_content.encode("utf-8"))
+            digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+        return {
+            "model": self.config.EMBEDDING_MODEL,
+            "quantized": self.config.EMBEDDING_QUANTIZE_CONFIG if self.config.EMBEDDING_QUANTIZE else None,
+            "metric": DistanceStrategy.MAX_INNER_PRODUCT.value,
+            "index_type": self.config.VECTOR_INDEX_TYPE,
+            "hnsw_m": self.config.HNSW_M,
+            "ivf_pq": [self.config.IVF_PQ_M, self.config.IVF_PQ_NBITS],
+            "docs": len(documents or []),
+            "docs_hash": digest.hexdigest(),
+        }
+
+    def _create_index(self, vectors: np.ndarray) -> "faiss.Index":
+        """Build the configured inner-product index (HNSW, IVF-PQ or flat) directly over the vectors."""
+        d = vectors.shape[1]
+        metric = faiss.METRIC_INNER_PRODUCT
+        index_type = self.config.VECTOR_INDEX_TYPE
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(d, self.config.HNSW_M, metric)
+            index.hnsw.efConstruction = self.config.HNSW_EF_CONSTRUCTION
+        # PQ codebooks need >= 2**nbits training points; keep exact search below that
+        elif index_type == "ivfpq" and len(vectors) >= 2 ** self.config.IVF_PQ_NBITS:
+            # ~4*sqrt(N) lists, capped so each centroid trains on >= 39 points
+            nlist = max(1, min(max(32, int(4 * np.sqrt(len(vectors)))), len(vectors) // 39))
+            index = faiss.IndexIVFPQ(
+                faiss.IndexFlatIP(d), d, nlist, self.config.IVF_PQ_M, self.config.IVF_PQ_NBITS, metric
+            )
+            index.train(vectors)
+        elif index_type in _SCALAR_QUANTIZER_TYPES:
+            # Exact scan over 8-bit / fp16 codes: 4x / 2x less memory traffic than float32
+            index = faiss.IndexScalarQuantizer(d, _SCALAR_QUANTIZER_TYPES[index_type], metric)
+            index.train(vectors)
+        else:
+            index = faiss.IndexFlatIP(d)
+        if len(vectors):
+            index.add(vectors)
+        return index
+
+    def _tune_index(self, vectorstore: FAISS) -> FAISS:
+        """Apply the query-time recall knobs (efSearch / nprobe), which are not persisted with the index."""
+        index = vectorstore.index
+        if isinstance(index, faiss.IndexHNSWFlat):
+            index.hnsw.efSearch = self.config.HNSW_EF_SEARCH
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = self.config.IVF_NPROBE
+        return vectorstore
+
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        """Key a document's vector by its text, which is all the embedding depends on."""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _reusable_vectors(self, index_path: Path, fingerprint: dict) -> dict:
+        """Map content hashes to vectors from the saved index when its embeddings are still valid."""
+        try:
+            saved = json.loads((index_path / "index_fingerprint.json").read_text(encoding="utf-8"))
+            # Vectors from another model/metric, or lossy codes (sq8 / ivfpq), are not reused
+            config_keys = ("model", "quantized", "metric", "index_type", "hnsw_m")
+            if (any(saved.get(key) != fingerprint[key] for key in config_keys)
+                    or fingerprint["index_type"] not in _EXACT_INDEX_TYPES):
+                return {}
+            hashes = json.loads((index_path / "index_docs.json").read_text(encoding="utf-8"))
+            index = faiss.read_index(str(index_path / "index.faiss"))
+            if index.ntotal != len(hashes):
+                return {}
+            return dict(zip(hashes, index.reconstruct_n(0, index.ntotal)))
+        except Exception as e:
+            logger.debug("No reusable vectors in %s: %s", index_path, e)
+            return {}
+
+    @staticmethod
+    def _encode_texts(embeddings: HuggingFaceEmbeddings, texts: list) -> np.ndarray:
+        """Encode texts straight to a float32 matrix, skipping embed_documents' ndarray -> list round trip."""
+        client = getattr(embeddings, "client", None)
+        if client is None or not hasattr(client, "encode"):
+            return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        # Same preprocessing and encode kwargs as HuggingFaceEmbeddings.embed_documents
+        encode_kwargs = {**getattr(embeddings, "encode_kwargs", {}), "convert_to_numpy": True}
+        vectors = client.encode([t.replace("\n", " ") for t in texts], **encode_kwargs)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _build_vector_store(self, documents: list, embeddings: HuggingFaceEmbeddings,
+                            hashes: List[str], known_vectors: Optional[dict] = None) -> FAISS:
+        """Embed documents in large chunks and wrap them in a FAISS store over the configured index.
+
+        known_vectors maps content hashes to vectors from a previous build; only
+        texts missing from it are sent through the embedding model.
+        """
+        known_vectors = known_vectors or {}
+        rows_by_hash = defaultdict(list)
+        for row, content_hash in enumerate(hashes):
+            rows_by_hash[content_hash].append(row)
+        # Each vector is written straight into one preallocated matrix, so peak memory is the
+        # final matrix plus one encoded chunk rather than every vector plus a stacked copy
+        vectors: Optional[np.ndarray] = None
+
+        def store(batch_hashes, batch_vectors):
+            nonlocal vectors
+            if vectors is None:
+                vectors = np.empty((len(hashes), len(batch_vectors[0])), dtype=np.float32)
+            for content_hash, vector in zip(batch_hashes, batch_vectors):
+                vectors[rows_by_hash[content_hash]] = vector
+
+        reused = [h for h in rows_by_hash if h in known_vectors]
+        if reused:
+            store(reused, [known_vectors[h] for h in reused])
+        missing = [(h, documents[rows[0]].page_content) for h, rows in rows_by_hash.items() if h not in known_vectors]
+        chunk_size = max(1, self.config.EMBEDDING_CHUNK_SIZE)
+        for start in range(0, len(missing), chunk_size):
+            batch = missing[start:start + chunk_size]
+            store([h for h, _ in batch], self._encode_texts(embeddings, [text for _, text in batch]))
+            logger.debug("Embedded %d/%d new documents", min(start + chunk_size, len(missing)), len(missing))
+        logger.info("Embedded %d documents, reused %d vectors", len(missing), len(hashes) - len(missing))
+
+        # Summary documents get their doc_type as a stable id so RAGChain can fetch them directly
+        ids = []
+        for doc in documents:
+            doc_type = doc.metadata.get("doc_type")
+            ids.append(doc_type if doc_type in _SUMMARY_DOC_TYPES and doc_type not in ids else str(uuid.uuid4()))
+        # The loader's Documents are stored as-is instead of being copied
+        docstore = InMemoryDocstore(dict(zip(ids, documents)))
+        return FAISS(
+            embedding_function=embeddings,
+            index=self._create_index(vectors),
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(ids)),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+
     @st.cache_resource
-    def create_vector_store(_self, documents: list, _embeddings: HuggingFaceEmbeddings) -> Optional[FAISS]:
-        """Create FAISS vector store from documents."""
+    def _load_vector_store(_self, _documents: list, _embeddings: HuggingFaceEmbeddings,
+                           data_fingerprint: str) -> FAISS:
+        """Load the persisted FAISS vector store, rebuilding it when documents or model change.
+
+        The documents are not hashed by Streamlit on every rerun; data_fingerprint
+        (the DataLoader source fingerprint) keys the in-memory cache instead.
+        Failures raise instead of returning a sentinel so Streamlit does not cache them.
+        """
+        index_path = Path(_self.config.FAISS_INDEX_PATH)
+        fingerprint_path = index_path / "index_fingerprint.json"
+        fingerprint = _self._index_fingerprint(_documents)
+
+        # Reuse the saved index only when it was built from the same docs and model
+        if fingerprint_path.exists():
+            try:
+                if json.loads(fingerprint_path.read_text(encoding="utf-8")) == fingerprint:
+                    return _self._tune_index(FAISS.load_local(
+                        str(index_path),
+                        _embeddings,
+                        allow_dangerous_deserialization=True,
+                        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+                    ))
+            except Exception as e:
+                logger.warning("Rebuilding FAISS index, saved copy unusable: %s", e)
+
+        # Re-embed only documents whose text is new since the saved index was built
+        hashes = [_self._content_hash(d.page_content) for d in _documents]
+        known_vectors = _self._reusable_vectors(index_path, fingerprint)
+        vectorstore = _self._tune_index(
+            _self._build_vector_store(_documents, _embeddings, hashes, known_vectors)
+        )
+        vectorstore.save_local(str(index_path))
+        logger.info("Built FAISS index over %d documents at %s", len(_documents), index_path)
+        (index_path / "index_docs.json").write_text(json.dumps(hashes), encoding="utf-8")
+        fingerprint_path.write_text(json.dumps(fingerprint, indent=2), encoding="utf-8")
+        
+        return vectorstore
+
+    def create_vector_store(self, documents: list, embeddings: HuggingFaceEmbeddings,
+                            data_fingerprint: str) -> Optional[FAISS]:
+        """Load or build the FAISS vector store; returns None and sets last_error on failure."""
         try:
-            # Always build fresh on startup to ensure index directory is created
-            vectorstore = FAISS.from_documents(
-                documents=documents,
-                embedding=_embeddings
-            )
-            vectorstore.save_local(_self.config.FAISS_INDEX_PATH)
-            
-            return vectorstore
-            
+            return self._load_vector_store(documents, embeddings, data_fingerprint)
+
         except Exception as e:
             import traceback
-            _self.last_error = (
+            self.last_error = (
                 "FAISS vector store creation failed\n"
-                f"Index path: {_self.config.FAISS_INDEX_PATH}\n"
+                f"Index path: {self.config.FAISS_INDEX_PATH}\n"
+                f"FAISS build: {self.faiss_compile_options} "
+                f"({self.config.FAISS_NUM_THREADS} threads)\n"
                 f"Docs: {len(documents) if documents else 0}\n"
                 f"Error: {e}\n"
                 f"Traceback:\n{traceback.format_exc()}"
             )
-            print(_self.last_error)
+            logger.error(self.last_error)
             return None
     
     @st.cache_resource
@@ -77,14 +691,15 @@ class AIComponents:
             api_key = _self.config.get_groq_api_key()
             if not api_key:
                 _self.last_error = "Missing GROQ_API_KEY in environment variables"
-                print(_self.last_error)
+                logger.error(_self.last_error)
                 return None
             
             llm = ChatGroq(
                 model=_self.config.GROQ_MODEL,
                 temperature=_self.config.LLM_TEMPERATURE,
                 max_tokens=_self.config.LLM_MAX_TOKENS,
-                groq_api_key=api_key
+                groq_api_key=api_key,
+                streaming=True
             )
             
             return llm
@@ -97,281 +712,31 @@ class AIComponents:
                 f"Error: {e}\n"
                 f"Traceback:\n{traceback.format_exc()}"
             )
-            print(_self.last_error)
+            logger.error(_self.last_error)
             return None
     
-    def create_ai_chain(self, vectorstore: FAISS, llm: ChatGroq) -> Tuple[Optional[Any], Optional[Any]]:
-        """Create a retrieval-augmented generation chain using the vector store."""
-        try:
-            retriever = vectorstore.as_retriever(search_kwargs={"k": self.config.VECTOR_STORE_K})
-
-            prompt_template = PromptTemplate(
-                input_variables=["context", "conversation_history", "question"],
-                template=(
-                    "You are a senior data analyst specializing in asset management and maintenance operations. "
-                    "You analyze complex business data to provide actionable insights.\n\n"
-                    
-                    "## Data Structure:\n"
-                    "All documents are prefixed with 'DOC: [TYPE]' where TYPE indicates the record type.\n"
-                    "Available types: ASSET, WORK ORDER, CUSTOMER, VENDOR, INVOICE, PURCHASE ORDER, "
-                    "EMPLOYEE, PART, SERVICE ITEM, WORK TYPE, WORK PRIORITY, etc.\n"
-                    "GLOBAL SUMMARY documents contain aggregate counts, totals, and statistical breakdowns.\n\n"
-                    
-                    "## Entity Relationships:\n"
-                    "- Assets are linked to Customers and have Work Orders\n"
-                    "- Work Orders generate Invoices and link to Employees\n"
-                    "- Vendors supply Purchase Orders and Parts\n"
-                    "- Invoices can originate from Work Orders and link to Customers\n"
-                    "- All entities can have Custom Fields with additional metadata\n\n"
-                    
-                    "CONVERSATION HISTORY:\n{conversation_history}\n\n"
-                    
-                    "CURRENT QUESTION: {question}\n\n"
-                    
-                    "AVAILABLE DATA (showing top {k} relevant documents):\n{context}\n\n"
-                    
-                    "## Response Style (Concise & Structured):\n"
-                    "- Default to brevity; keep under 6 lines unless asked for more.\n"
-                    "- Answer only what is asked. No extra context or preamble.\n"
-                    "- Organize with short headings (use '###') and bullets.\n"
-                    "- Prefer lists/tables over paragraphs.\n"
-                    "- Put key numbers first and make them **bold**.\n"
-                    "- If information is missing, state it in one line, then ask one targeted follow-up.\n"
-                    "- For long lists (>20 items), ask for confirmation before listing all.\n"
-                    "- Never repeat the question or include source citations.\n\n"
-
-                    "## Language Behavior:\n"
-                    "- Respond in the user's requested language when specified.\n"
-                    "- If the user says to 'tell the previous details again in Japanese' (e.g., '日本語で', 'Japanese'),\n"
-                    "  then re-state the last assistant answer translated into natural Japanese, preserving structure, counts, and items exactly.\n"
-                    "- Do not re-analyze or change numbers/content; only translate and adapt headings/bullets to Japanese.\n"
-                    "- Use concise Japanese, with short headings and bullets.\n\n"
-
-                    "## Analytical Response Guidelines:\n"
-                    "1. Count Queries (how many, count, total):\n"
-                    "   - Prefer GLOBAL SUMMARY when present.\n"
-                    "   - Extract exact numbers only.\n"
-                    "   - Answer with just the metric; key number first and **bold**.\n"
-                    "   - Keep it to a single bullet unless more detail is requested.\n\n"
-
-                    "2. List Queries (list all, show all):\n"
-                    "   - Return bullets only, no commentary.\n"
-                    "   - Prefer authoritative summary docs when present.\n"
-                    "   - Include human-readable identifiers only (e.g., name, id, email, status).\n"
-                    "   - Exclude internal keys (e.g., contactKey, customerKey, vendorKey, addressKey, phoneKey).\n"
-                    "   - Use 'Name – id, email, status' inline format; use '-' for missing fields.\n"
-                    "   - If total N is stated, output exactly N items.\n"
-                    "   - If N > 20, first ask: 'Show all N?' and wait unless user confirms.\n"
-                    "   - One item per line starting with '- '.\n\n"
-
-                    "3. Aggregations (sum, average, min, max, median, group by):\n"
-                    "   - Calculate strictly from the provided context; do not invent values.\n"
-                    "   - State units and currency when known.\n"
-                    "   - Show a one-line formula summary when non-trivial.\n"
-                    "   - When grouping, present a compact table: group, count, sum, avg as relevant.\n"
-                    "   - Keep to 3-5 bullets unless asked for more.\n"
-                    "   - Handle missing values by excluding nulls unless the user requests otherwise.\n\n"
-
-                    "4. Analytics (trends, outliers, distributions, comparisons):\n"
-                    "   - Base insights only on data in context.\n"
-                    "   - Identify top contributors and anomalies with simple metrics.\n"
-                    "   - If a time range is implied, state the range detected from the data.\n"
-                    "   - Keep insights to 3 to 5 tight bullets unless asked for more.\n\n"
-
-                    "5. Detail Queries (tell me about, details of):\n"
-                    "   - Extract comprehensive information from DOC entries.\n"
-                    "   - Include related entities only if asked.\n"
-                    "   - Never expose internal keys; omit fields ending with 'Key' (e.g., contactKey).\n\n"
-                    
-
-                    "## General Rules:\n"
-                    "- Use exact numbers from context; include units and currency when known.\n"
-                    "- Do not hallucinate fields or records; if data is insufficient, say what is missing.\n"
-                    "- Include only human-readable IDs where relevant (assetId, workOrderNumber, invoiceNumber, customerId, vendorId).\n"
-                    "- Do NOT include internal numeric keys (e.g., contactKey, customerKey, vendorKey, addressKey, phoneKey).\n"
-                    "- No recommendations unless asked.\n\n"
-
-                    "CRITICAL FORMATTING RULES:\n"
-                    "- Start responses immediately; no preambles or sources.\n"
-                    "- One bullet per line, starting with '- '.\n"
-                    "- Use short '###' headings when helpful.\n"
-                    "- Keep under 6 lines by default; ask to expand if needed.\n\n"
-                    
-                    "Remember: Be concise, structured, and grounded only in the provided documents."
-                ).replace("{k}", str(self.config.VECTOR_STORE_K))
-            )
+    @st.cache_resource
+    def _build_ai_chain(_self, _vectorstore: FAISS, _llm: ChatGroq, data_fingerprint: str) -> Tuple[Any, Any]:
+        """Build the RAG chain, cached per data version.
 
-            class RAGChain:
-                def __init__(self, llm, retriever, prompt_template, vectorstore):
-                    self.llm = llm
-                    self.retriever = retriever
-                    self.prompt_template = prompt_template
-                    self.vectorstore = vectorstore
-
-                @staticmethod
-                def _sanitize_output(text: str) -> str:
-                    """Remove internal keys such as contactKey from LLM output and fix formatting."""
-                    if not isinstance(text, str):
-                        return text
-                    # Remove explicit 'contactKey: <number>' patterns
-                    text = re.sub(r"\bcontactKey\s*:\s*\d+", "", text)
-                    # Remove standalone 'contactKey' labels in bullets or tables
-                    text = re.sub(r"(?i)\bcontactKey\b", "", text)
-                    
-                    # Fix bullet point formatting - ensure each bullet is on its own line
-                    # Look for patterns like "Site: X - Another Site: Y" where multiple items are on one line
-                    # Split on " - " that separates different entities
-                    lines = text.split('\n')
-                    fixed_lines = []
-                    for line in lines:
-                        # Check if line contains multiple items separated by " - "
-                        # Pattern: "Name: value - Name2: value2" but not "Name - value" (which is single item)
-                        if line.count(' - ') > 1 or (' - ' in line and line.count(':') >= 2):
-                            # This line has multiple items, split them
-                            parts = line.split(' - ')
-                            for part in parts:
-                                part = part.strip()
-                                if part and not part.startswith('- '):
-                                    fixed_lines.append(part)
-                        else:
-                            fixed_lines.append(line)
-                    
-                    text = '\n'.join(fixed_lines)
-                    
-                    # Add blank line before conclusion sentences
-                    # Look for patterns like "The entity with..." or "In conclusion" etc after lists
-                    conclusion_patterns = [
-                        r'^(The (?:entity|company|organization|business).+)',
-                        r'^(In conclusion.+)',
-                        r'^(Therefore.+)',
-                        r'^(As (?:a result|shown).+)'
-                    ]
-                    
-                    lines = text.split('\n')
-                    result_lines = []
-                    prev_was_list_item = False
-                    
-                    for i, line in enumerate(lines):
-                        # Check if line is a list item (has "Name: number" pattern)
-                        is_list_item = (line.strip() and ':' in line and 
-                                       any(char.isdigit() for char in line) and
-                                       not line.strip().startswith('#') and
-                                       not line.strip().startswith('The ') and
-                                       not line.strip().startswith('- '))
-                        
-                        # Check if line is a conclusion
-                        is_conclusion = any(re.search(pattern, line.strip()) for pattern in conclusion_patterns)
-                        
-                        if is_conclusion and prev_was_list_item:
-                            # Add blank line before conclusion
-                            result_lines.append('')
-                        
-                        result_lines.append(line)
-                        prev_was_list_item = is_list_item
-                    
-                    text = '\n'.join(result_lines)
-                    
-                    # Minimal cleanup - preserve structure
-                    text = re.sub(r' {2,}', ' ', text)  # Multiple spaces to single space
-                    return text.strip()
-
-                def invoke(self, question: str, conversation_history: str = ""):
-                    try:
-                        # Comprehensive normalization for common misspellings
-                        qnorm = (question or "").lower()
-                        normalization_map = {
-                            "assests": "assets",
-                            "assest": "asset", 
-                            "workorder": "work order",
-                            "workorders": "work orders",
-                            "purchaseorder": "purchase order",
-                            "purchaseorders": "purchase orders",
-                            "customers": "customer",
-                            "vendors": "vendor",
-                            "invoices": "invoice",
-                            "employees": "employee",
-                            "parts": "part",
-                            "serviceitems": "service item"
-                        }
-                        
-                        for wrong, correct in normalization_map.items():
-                            qnorm = qnorm.replace(wrong, correct)
-
-                        # Detect query intent for intelligent retrieval
-                        count_keywords = ["how many", "count", "total", "number of", "amount of"]
-                        is_count_query = any(keyword in qnorm for keyword in count_keywords)
-                        
-                        # Detect list queries for special handling (broadened)
-                        list_keywords = [
-                            "list all", "show all", "show me all", "all customers", "all vendors", "all employees", "all assets",
-                            "list customers", "list customer", "customers list", "customer list", "list customer details", "customer details",
-                            "show customers", "show customer details", "get customers", "display customers"
-                        ]
-                        is_list_query = any(keyword in qnorm for keyword in list_keywords)
-                        
-                        # More robust entity detection
-                        entity_keywords = {
-                            "asset": ["asset", "assest", "assests"],
-                            "customer": ["customer", "clients", "client"],
-                            "vendor": ["vendor", "supplier", "suppliers"],
-                            "work_order": ["work order", "workorder", "work orders"],
-                            "invoice": ["invoice", "invoices"],
-                            "employee": ["employee", "staff", "worker"],
-                            "part": ["part", "parts"],
-                            "purchase_order": ["purchase order", "purchaseorder", "po"]
-                        }
-
-                        # Use normalized query for retrieval (LangChain >= 0.1.46)
-                        docs = self.retriever.invoke(qnorm)
-                        parts = [d.page_content for d in docs]
-                        
-                        # Always include summary documents if present for intelligent retrieval
-                        global_summary_content = None
-                        customers_summary_content = None
-                        try:
-                            store = getattr(self.vectorstore, "docstore", None)
-                            mapping = getattr(store, "_dict", {}) if store else {}
-                            for _id, doc in mapping.items():
-                                if isinstance(doc, Document):
-                                    if doc.metadata.get("doc_type") == "global_summary":
-                                        global_summary_content = doc.page_content
-                                    elif doc.metadata.get("doc_type") == "customers_summary":
-                                        customers_summary_content = doc.page_content
-                        except Exception:
-                            pass
-                        
-                        # For count queries, ALWAYS prioritize global summary at the TOP
-                        if is_count_query and global_summary_content:
-                            parts.insert(0, global_summary_content)
-                            # Also append it at the end as backup to ensure it's in context
-                            if global_summary_content not in parts[1:]:
-                                parts.append(global_summary_content)
-                        
-                        # For list queries, prioritize relevant summary documents and ensure they are first
-                        if is_list_query:
-                            if customers_summary_content and ("customer" in qnorm or "customers" in qnorm):
-                                if customers_summary_content in parts:
-                                    parts.remove(customers_summary_content)
-                                parts.insert(0, customers_summary_content)
-                        
-                        # For general queries, include global summary at the end for context
-                        if not is_count_query and global_summary_content and global_summary_content not in parts:
-                            parts.append(global_summary_content)
-                        
-                        context = "\n\n---\n\n".join(parts)
-                        prompt = self.prompt_template.format(
-                            context=context,
-                            conversation_history=conversation_history or "No previous conversation.",
-                            question=qnorm,
-                        )
-                        response = self.llm.invoke(prompt)
-                        raw = getattr(response, 'content', str(response))
-                        return self._sanitize_output(raw)
-                    except Exception as e:
-                        print(f"Error in RAGChain.invoke: {e}")
-                        return f"Error processing request: {str(e)}"
-
-            return RAGChain(llm, retriever, prompt_template, vectorstore), retriever
+        Failures raise instead of returning a sentinel so Streamlit does not cache them.
+        """
+        retriever = _vectorstore.as_retriever(search_kwargs={"k": _self.config.VECTOR_STORE_K})
+        chain = RAGChain(
+            _llm, retriever, _vectorstore, _self.config.VECTOR_STORE_K,
+            retrieval_cache_size=_self.config.RETRIEVAL_CACHE_SIZE,
+        )
+        return chain, retriever
+
+    def create_ai_chain(self, vectorstore: FAISS, llm: ChatGroq,
+                        data_fingerprint: str) -> Tuple[Optional[Any], Optional[Any]]:
+        """Create a retrieval-augmented generation chain using the vector store.
+
+        data_fingerprint (the DataLoader source fingerprint) keys the cached chain,
+        so a data reload gets a chain bound to the new vector store.
+        """
+        try:
+            return self._build_ai_chain(vectorstore, llm, data_fingerprint)
 
         except Exception as e:
             import traceback
@@ -380,5 +745,5 @@ class AIComponents:
                 f"Error: {e}\n"
                 f"Traceback:\n{traceback.format_exc()}"
             )
-            print(self.last_error)
+            logger.error(self.last_error)
             return None, None
@@ -18,14 +18,45 @@ class Config:
         # New: base directory containing all related JSON sources
         self.JSON_DIR = "JsonData"
         self.FAISS_INDEX_PATH = "./faiss_index"
+        # Processed data cache (keyed by JsonData file sizes and mtimes)
+        self.CACHE_DIR = "./.cache"
+        # JsonData files at least this large are stream-parsed with ijson (if installed)
+        self.JSON_STREAM_MIN_BYTES = 100 * 1024 * 1024
         
         # AI Model settings
         # Use sentence-transformers directly (more compatible)
         self.EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
         self.GROQ_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+        # Optional int8 ONNX embeddings; only faster on CPUs with VNNI/AVX-512 support
+        self.EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "false").lower() in ("1", "true", "yes")
+        self.EMBEDDING_QUANTIZE_CONFIG = os.getenv("EMBEDDING_QUANTIZE_CONFIG", "avx512_vnni")
+        self.EMBEDDING_QUANTIZED_PATH = "./models/embed_int8"
+        # CPU threads for embedding inference (torch / ONNX Runtime intra-op pool)
+        self.EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", os.cpu_count() or 1))
+        # Opt-in torch.compile of the embedding transformer (slower first encode, faster after)
+        self.EMBEDDING_TORCH_COMPILE = os.getenv("EMBEDDING_TORCH_COMPILE", "false").lower() in ("1", "true", "yes")
+        # Larger encode batches keep the transformer GEMMs busy during index builds
+        self.EMBEDDING_BATCH_SIZE = 128
+        # Documents handed to each embed_documents call while building the index
+        self.EMBEDDING_CHUNK_SIZE = 512
         
         # Vector store settings
         self.VECTOR_STORE_K = 50  # Increase recall for list-style queries
+        # ANN index: "hnsw" for graph search, "ivfpq" for product-quantized
+        # inverted lists (smallest memory), "flat" for exact brute-force search,
+        # "sq8"/"fp16" for brute-force search over scalar-quantized vectors
+        self.VECTOR_INDEX_TYPE = "hnsw"
+        self.HNSW_M = 32
+        self.HNSW_EF_CONSTRUCTION = 64
+        self.HNSW_EF_SEARCH = max(32, self.VECTOR_STORE_K * 4)
+        self.IVF_PQ_M = 16  # sub-quantizers; must divide the embedding dimension
+        self.IVF_PQ_NBITS = 8
+        self.IVF_NPROBE = 8
+        # OpenMP threads used by FAISS index build/search
+        self.FAISS_NUM_THREADS = int(os.getenv("FAISS_NUM_THREADS", os.cpu_count() or 1))
+        
+        # Retrieved documents memoized per normalized question (0 disables)
+        self.RETRIEVAL_CACHE_SIZE = 512
         
         # LLM settings
         self.LLM_TEMPERATURE = 0.7
@@ -3,78 +3,22 @@ UI components module for the Eptura Asset AI.
 Handles all Streamlit UI elements and interactions with a clean, ChatGPT-like interface.
 """
 
+import codecs
+import json
+import mmap
+import orjson
+import re
 import streamlit as st
-from typing import Any
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
 
+# Asset ID pattern, compiled once at import
+_ASSET_ID_RE = re.compile(r"asset\s+([A-Za-z0-9\-_.]+)", re.IGNORECASE)
 
-class UIComponents:
-    """Handles all UI components and interactions."""
-    
-    def __init__(self):
-        """Initialize UI components and ephemeral multi-chat state."""
-        self.example_queries = [
-            "Show me all assets from Singapore",
-            "List all Caterpillar machines", 
-            "What is the warranty expiration date for MPT-001?",
-            "How many assets are in each category?"
-        ]
-        self._ensure_chat_state()
-
-    def _ensure_chat_state(self):
-        """Create in-memory chat registry without external storage."""
-        if "chats" not in st.session_state:
-            st.session_state.chats = []  # [{id, title, messages:[{role,content}]}]
-        if "active_chat_id" not in st.session_state:
-            st.session_state.active_chat_id = None
-        if "next_chat_id" not in st.session_state:
-            st.session_state.next_chat_id = 1
-
-        # Ensure at least one chat exists and is active
-        if not st.session_state.chats:
-            self._start_new_chat()
-        if st.session_state.active_chat_id is None:
-            st.session_state.active_chat_id = st.session_state.chats[0]["id"]
-
-    def _start_new_chat(self):
-        """Create a new empty chat and make it active (newest on top)."""
-        cid = st.session_state.next_chat_id
-        st.session_state.next_chat_id += 1
-        chat = {"id": cid, "title": "Open chat", "messages": []}
-        st.session_state.chats.insert(0, chat)
-        st.session_state.active_chat_id = cid
-
-    def _get_active_chat(self):
-        for c in st.session_state.chats:
-            if c["id"] == st.session_state.active_chat_id:
-                return c
-        return None
 
-    def _truncate_title(self, title: str, max_len: int = 20) -> str:
-        """Return a display-safe title of at most max_len characters, adding '...' if truncated."""
-        safe = (title or "").strip()
-        if len(safe) <= max_len:
-            return safe
-        return safe[:max_len] + "..."
-
-    def _delete_chat(self, chat_id: int):
-        st.session_state.chats = [c for c in st.session_state.chats if c["id"] != chat_id]
-        if not st.session_state.chats:
-            self._start_new_chat()
-        st.session_state.active_chat_id = st.session_state.chats[0]["id"]
-    
-    def _select_chat(self, chat_id: int):
-        """Set the active chat (button callback)."""
-        if any(c["id"] == chat_id for c in st.session_state.chats):
-            st.session_state.active_chat_id = chat_id
-    
-    def _delete_chat_callback(self, chat_id: int):
-        """Start delete confirmation for a chat."""
-        st.session_state.pending_delete_chat_id = chat_id
-    
-    def display_title(self):
-        """Display the main title and description."""
-        # Custom CSS for better styling
-        st.markdown("""
+# Page styles, emitted by display_title
+_APP_CSS = """
         <style>
         .main-title {
             font-size: 1rem;
@@ -249,7 +193,204 @@ class UIComponents:
             .subtitle { font-size: 0.9rem; }
         }
         </style>
-        """, unsafe_allow_html=True)
+        """
+
+def _is_open_work_orders_query(q: str) -> bool:
+    """Whether a lower-cased query asks for open work orders."""
+    # "open wo" is a prefix of "open wos", "open work order" and "open work orders"
+    return "open wo" in q or ("work orders" in q and "open" in q)
+
+
+def _load_json_safe(path: Path):
+    """Load a JSON file, preferring orjson on UTF-8 and falling back to legacy encodings."""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                # orjson parses the mapped pages directly; views must be released before the mapping closes
+                start = len(codecs.BOM_UTF8) if mm[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+                with memoryview(mm) as view, view[start:] as body:
+                    return orjson.loads(body)
+            except Exception:
+                raw = mm[:]
+    except Exception:
+        # Missing or empty files (an empty file cannot be mapped)
+        return []
+    for enc in ['latin-1', 'cp1252']:
+        try:
+            return json.loads(raw.decode(enc))
+        except Exception:
+            continue
+    return []
+
+
+def _file_signature(path: Path):
+    """(path, mtime, size) cache key for a file, or None when it cannot be stat'ed."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _invoice_index_cached(path: str, mtime_ns: int, size: int):
+    """Group invoice numbers by originating work order key and number, once per file version."""
+    # Only invoice numbers are displayed, so the parsed invoices are not kept alive by the cache
+    invs_by_wo_key = defaultdict(list)
+    invs_by_wo_num = defaultdict(list)
+    for inv in _load_json_safe(Path(path)) or []:
+        inv_num = inv.get("invoiceNumber")
+        if inv_num is None:
+            continue
+        wo_key = inv.get("originatingWorkOrderKey")
+        if wo_key is not None:
+            invs_by_wo_key[wo_key].append(inv_num)
+        wo_num = inv.get("originatingWorkOrderNumber")
+        if wo_num is not None:
+            invs_by_wo_num[wo_num].append(inv_num)
+    return invs_by_wo_key, invs_by_wo_num
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _open_work_orders_text_cached(path: str, mtime_ns: int, size: int) -> str:
+    """Render the open work orders answer, which depends only on the file version."""
+    work_orders = _load_json_safe(Path(path)) or []
+
+    # Option B: statusId=="New" AND dateCompleted is null AND workOrderActive==true
+    def is_open(wo: dict) -> bool:
+        if (wo.get("statusId") or "").strip().lower() != "new":
+            return False
+        completed = wo.get("dateCompleted")
+        return (completed is None or str(completed).strip() == "") and bool(wo.get("workOrderActive", False))
+
+    open_wos = [wo for wo in work_orders if is_open(wo)]
+    if not open_wos:
+        return "**0 open work orders** found."
+
+    # Group by entityName
+    grouped = defaultdict(list)
+    for wo in open_wos:
+        grouped[(wo.get("entityName") or "Unknown").strip()].append(wo)
+
+    # Sort groups and items (by dateCreated desc within group)
+    for items in grouped.values():
+        items.sort(key=lambda x: (x.get("dateCreated") or ""), reverse=True)
+
+    lines = ["### Open Work Orders", "", f"- **Count**: {len(open_wos)}", "- **By entity**:"]
+    for ent in sorted(grouped):
+        items = grouped[ent]
+        lines.append(f"  - **{ent}** ({len(items)})")
+        for wo in items:
+            won = wo.get("workOrderNumber")
+            wok = wo.get("workOrderKey")
+            dc = wo.get("dateCreated")
+            status = wo.get("statusId")
+            pr = wo.get("priorityId")
+            lines.append(f"    - WO #{won or wok}: {status}, created {dc}, priority {pr}")
+
+    return "\n".join(lines)
+
+
+class _WorkOrderRow(NamedTuple):
+    """The work order fields shown by the per-asset lookup."""
+    number: Any
+    status: Any
+    work_type: Any
+    priority: Any
+    assigned: Any
+    invoices: list
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _work_orders_by_asset_cached(wo_signature: tuple, inv_signature: Optional[tuple]):
+    """Group compact work order rows by their stripped assetId, once per work order and invoice file version."""
+    invs_by_wo_key, invs_by_wo_num = _invoice_index_cached(*inv_signature) if inv_signature else ({}, {})
+    wos_by_asset = defaultdict(list)
+    for wo in _load_json_safe(Path(wo_signature[0])) or []:
+        wo_num = wo.get("workOrderNumber")
+        # Keys and numbers share a value space, so each is looked up in its own index
+        invoices = sorted({*invs_by_wo_key.get(wo.get("workOrderKey"), ()), *invs_by_wo_num.get(wo_num, ())})
+        wos_by_asset[(wo.get("assetId") or "").strip()].append(_WorkOrderRow(
+            wo_num, wo.get("statusId"), wo.get("workTypeId"), wo.get("priorityId"), wo.get("assigned"), invoices,
+        ))
+    # Listed in work order number order; sorting here keeps queries to a slice
+    for rows in wos_by_asset.values():
+        rows.sort(key=lambda row: row.number or 0)
+    return wos_by_asset
+
+
+class UIComponents:
+    """Handles all UI components and interactions."""
+    
+    def __init__(self):
+        """Initialize UI components and ephemeral multi-chat state."""
+        self.example_queries = [
+            "Show me all assets from Singapore",
+            "List all Caterpillar machines", 
+            "What is the warranty expiration date for MPT-001?",
+            "How many assets are in each category?"
+        ]
+        self._ensure_chat_state()
+
+    def _ensure_chat_state(self):
+        """Create in-memory chat registry without external storage."""
+        if "chats" not in st.session_state:
+            st.session_state.chats = []  # [{id, title, messages:[{role,content}]}]
+        if "active_chat_id" not in st.session_state:
+            st.session_state.active_chat_id = None
+        if "next_chat_id" not in st.session_state:
+            st.session_state.next_chat_id = 1
+        if "chats_by_id" not in st.session_state:
+            # Same chat dicts as st.session_state.chats (which keeps display order), keyed by id
+            st.session_state.chats_by_id = {c["id"]: c for c in st.session_state.chats}
+
+        # Ensure at least one chat exists and is active
+        if not st.session_state.chats:
+            self._start_new_chat()
+        if st.session_state.active_chat_id is None:
+            st.session_state.active_chat_id = st.session_state.chats[0]["id"]
+
+    def _start_new_chat(self):
+        """Create a new empty chat and make it active (newest on top)."""
+        cid = st.session_state.next_chat_id
+        st.session_state.next_chat_id += 1
+        chat = {"id": cid, "title": "Open chat", "messages": []}
+        st.session_state.chats.insert(0, chat)
+        st.session_state.chats_by_id[cid] = chat
+        st.session_state.active_chat_id = cid
+
+    def _get_active_chat(self):
+        return st.session_state.chats_by_id.get(st.session_state.active_chat_id)
+
+    def _truncate_title(self, title: str, max_len: int = 20) -> str:
+        """Return a display-safe title of at most max_len characters, adding '...' if truncated."""
+        safe = (title or "").strip()
+        if len(safe) <= max_len:
+            return safe
+        return safe[:max_len] + "..."
+
+    def _delete_chat(self, chat_id: int):
+        chat = st.session_state.chats_by_id.pop(chat_id, None)
+        if chat is not None:
+            st.session_state.chats.remove(chat)
+        if not st.session_state.chats:
+            self._start_new_chat()
+        st.session_state.active_chat_id = st.session_state.chats[0]["id"]
+    
+    def _select_chat(self, chat_id: int):
+        """Set the active chat (button callback)."""
+        if chat_id in st.session_state.chats_by_id:
+            st.session_state.active_chat_id = chat_id
+    
+    def _delete_chat_callback(self, chat_id: int):
+        """Start delete confirmation for a chat."""
+        st.session_state.pending_delete_chat_id = chat_id
+    
+    def display_title(self):
+        """Display the main title and description."""
+        # Custom CSS for better styling; Streamlit drops elements a rerun does not emit again,
+        # so the styles are sent on every run
+        st.markdown(_APP_CSS, unsafe_allow_html=True)
         
         st.markdown('<div class="main-title"><strong>Eptura Asset AI</strong></div>', unsafe_allow_html=True)
         st.markdown('<p class="subtitle">Ask me anything about your assets. I can help you find, analyze, and understand your asset data.</p>', unsafe_allow_html=True)
@@ -322,12 +463,21 @@ class UIComponents:
                         conversation_history = self._build_conversation_history(active_chat)
                         
                         # Check if it's a specific query that needs exact data
+                        response = None
                         if self._is_data_query(prompt):
                             response = self._get_exact_data_response(prompt)
-                        else:
-                            response = ai_chain.invoke(prompt, conversation_history=conversation_history)
                         
-                        st.markdown(response)
+                        if response is None:
+                            # Stream the answer as it is generated, then swap in the final formatting
+                            placeholder = st.empty()
+                            with placeholder:
+                                streamed = st.write_stream(
+                                    ai_chain.stream(prompt, conversation_history=conversation_history)
+                                )
+                            response = ai_chain.format_answer(streamed)
+                            placeholder.markdown(response)
+                        else:
+                            st.markdown(response)
                         
                         # Add assistant response to chat history
                         active_chat["messages"].append({"role": "assistant", "content": response})
@@ -348,153 +498,39 @@ class UIComponents:
     def _is_data_query(self, query: str) -> bool:
         """Check if query needs exact data lookup (deterministic)."""
         q = (query or "").lower()
-        if ("work order" in q or "work orders" in q) and "asset" in q:
-            return True
-        # Detect open work orders intents
-        if ("open work orders" in q or "open work order" in q or "open wo" in q or "open wos" in q
-            or ("work orders" in q and "open" in q)):
-            return True
-        return False
+        # "work order" also matches "work orders"
+        return ("work order" in q and "asset" in q) or _is_open_work_orders_query(q)
     
-    def _analyze_floors(self, data: list) -> str:
-        """Comprehensive floor analysis from the dataset."""
-        floors = set()
-        floor_details = {}
-        
-        for asset in data:
-            # Check group field for floor indicators
-            group = asset.get('groupId', '')
-            if any(floor_indicator in group for floor_indicator in ['_1F', '_2F', '_3F', '_4F', '_5F', 'FLOOR']):
-                floors.add(group)
-                if group not in floor_details:
-                    floor_details[group] = []
-                floor_details[group].append(asset.get('assetId', 'N/A'))
-            
-            # Check custom fields for Floor field
-            custom_fields = asset.get('customFields', [])
-            for field in custom_fields:
-                if field.get('fieldName') == 'Floor' and field.get('value'):
-                    floor_value = field.get('value')
-                    if floor_value and floor_value != 'null':
-                        floor_key = f"Floor {floor_value}"
-                        floors.add(floor_key)
-                        if floor_key not in floor_details:
-                            floor_details[floor_key] = []
-                        floor_details[floor_key].append(asset.get('assetId', 'N/A'))
-        
-        if not floors:
-            return "**0 floors** found in the data."
-        
-        response = f"**{len(floors)} floors** found:\n\n"
-        for floor in sorted(floors):
-            asset_count = len(floor_details[floor])
-            response += f"**{floor}** ({asset_count} assets)\n"
-        
-        return response
-
-    def _analyze_hk_equipment_plants(self, data: list) -> str:
-        """Analyze HK Equipment plants from the dataset."""
-        hk_assets = [asset for asset in data if asset.get('entityName', '').upper() == 'HK EQUIPMENT']
-        
-        if not hk_assets:
-            return "**0 plants** found for HK Equipment."
-        
-        plants = {}
-        for asset in hk_assets:
-            group = asset.get('groupId', 'No Group')
-            if group not in plants:
-                plants[group] = []
-            plants[group].append({
-                'assetId': asset.get('assetId', 'N/A'),
-                'description': asset.get('description', 'N/A'),
-                'categoryId': asset.get('categoryId', 'N/A')
-            })
-        
-        # Filter for plant-related groups
-        plant_groups = {k: v for k, v in plants.items() if 'PLANT' in k.upper()}
-        
-        if not plant_groups:
-            return f"**0 plants** found for HK Equipment. Found {len(plants)} other groups: {', '.join(plants.keys())}"
-        
-        response = f"**HK Equipment has {len(plant_groups)} plants:**\n\n"
-        for plant, assets in sorted(plant_groups.items()):
-            response += f"**{plant}** ({len(assets)} assets)\n"
-            for asset in assets[:5]:  # Show first 5 assets
-                response += f"  - {asset['assetId']}: {asset['description']} ({asset['categoryId']})\n"
-            if len(assets) > 5:
-                response += f"  ... and {len(assets) - 5} more assets\n"
-            response += "\n"
-        
-        return response
-
     def _get_exact_data_response(self, query: str) -> str:
         """Deterministic lookup for work orders by assetId, including priorities and linked invoices."""
         try:
-            import re
-            import json
-            from pathlib import Path
-
             q = (query or "")
             ql = q.lower()
 
             # If query requests open work orders (global)
-            if ("open work orders" in ql or "open work order" in ql or "open wo" in ql or "open wos" in ql
-                or ("work orders" in ql and "open" in ql)):
+            if _is_open_work_orders_query(ql):
                 return self._get_open_work_orders_response()
 
             # Otherwise, extract assetId token after the word 'asset'
-            m = re.search(r"asset\s+([A-Za-z0-9\-_.]+)", q, flags=re.IGNORECASE)
+            m = _ASSET_ID_RE.search(q)
             if not m:
                 return None
             asset_id = m.group(1).strip()
 
             base = Path("JsonData")
-            wo_path = base / "WorkOrders.json"
-            inv_path = base / "Invoice.json"
-
-            if not wo_path.exists():
+            wo_signature = _file_signature(base / "WorkOrders.json")
+            if wo_signature is None:
                 return None
 
-            def load_json_safe(path: Path):
-                for enc in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-                    try:
-                        with open(path, 'r', encoding=enc) as f:
-                            return json.load(f)
-                    except Exception:
-                        continue
-                return []
-
-            wos = load_json_safe(wo_path) or []
-            invoices = load_json_safe(inv_path) or []
-
-            # Index invoices by originating work order (both key and number)
-            invs_by_wo_key = {}
-            invs_by_wo_num = {}
-            for inv in invoices:
-                if inv.get("originatingWorkOrderKey") is not None:
-                    invs_by_wo_key.setdefault(inv.get("originatingWorkOrderKey"), []).append(inv)
-                if inv.get("originatingWorkOrderNumber") is not None:
-                    invs_by_wo_num.setdefault(inv.get("originatingWorkOrderNumber"), []).append(inv)
-
-            # Filter WOs
-            target_wos = [wo for wo in wos if (wo.get("assetId") or "").strip() == asset_id]
+            # Work orders per asset with their linked invoice numbers, cached per file version
+            wos_by_asset = _work_orders_by_asset_cached(wo_signature, _file_signature(base / "Invoice.json"))
+            target_wos = wos_by_asset.get(asset_id)
             if not target_wos:
                 return f"No work orders found for asset {asset_id}."
 
             # Format
             lines = [f"Work orders for asset {asset_id} ({len(target_wos)} found):"]
-            for wo in sorted(target_wos, key=lambda x: x.get("workOrderNumber") or 0)[:50]:
-                wo_num = wo.get("workOrderNumber")
-                wo_key = wo.get("workOrderKey")
-                pr = wo.get("priorityId")
-                wt = wo.get("workTypeId")
-                st = wo.get("statusId")
-                asg = wo.get("assigned")
-                # Find invoices linked to this WO
-                linked = []
-                linked.extend(invs_by_wo_key.get(wo_key, []))
-                linked.extend(invs_by_wo_num.get(wo_num, []))
-                inv_nums = sorted({inv.get("invoiceNumber") for inv in linked if inv.get("invoiceNumber") is not None})
+            for wo_num, st, wt, pr, asg, inv_nums in target_wos[:50]:
                 inv_text = f"Linked invoices: {inv_nums}" if inv_nums else "Linked invoices: None"
                 lines.append(f"- WO #{wo_num} [$" + str(st) + f"] Type={wt} Priority={pr} Assigned={asg}. {inv_text}")
 
@@ -505,75 +541,25 @@ class UIComponents:
     def _get_open_work_orders_response(self) -> str:
         """Return open work orders with strict filtering and nested list formatting grouped by entity."""
         try:
-            import json
-            from pathlib import Path
-
-            base = Path("JsonData")
-            wo_path = base / "WorkOrders.json"
-            if not wo_path.exists():
+            signature = _file_signature(Path("JsonData") / "WorkOrders.json")
+            if signature is None:
                 return "No work order data available."
-
-            def load_json_safe(path: Path):
-                for enc in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-                    try:
-                        with open(path, 'r', encoding=enc) as f:
-                            return json.load(f)
-                    except Exception:
-                        continue
-                return []
-
-            work_orders = load_json_safe(wo_path) or []
-
-            # Option B: statusId=="New" AND dateCompleted is null AND workOrderActive==true
-            def is_open(wo: dict) -> bool:
-                return (
-                    (wo.get("statusId") or "").strip().lower() == "new" and
-                    (wo.get("dateCompleted") is None or str(wo.get("dateCompleted")).strip() == "") and
-                    bool(wo.get("workOrderActive", False))
-                )
-
-            open_wos = [wo for wo in work_orders if is_open(wo)]
-            if not open_wos:
-                return "**0 open work orders** found."
-
-            # Group by entityName
-            grouped = {}
-            for wo in open_wos:
-                ent = (wo.get("entityName") or "Unknown").strip()
-                grouped.setdefault(ent, []).append(wo)
-
-            # Sort groups and items (by dateCreated desc within group)
-            for ent, items in grouped.items():
-                items.sort(key=lambda x: (x.get("dateCreated") or ""), reverse=True)
-
-            lines = ["### Open Work Orders", "", f"- **Count**: {len(open_wos)}", "- **By entity**:"]
-            for ent in sorted(grouped.keys()):
-                items = grouped[ent]
-                lines.append(f"  - **{ent}** ({len(items)})")
-                for wo in items:
-                    won = wo.get("workOrderNumber")
-                    wok = wo.get("workOrderKey")
-                    dc = wo.get("dateCreated")
-                    st = wo.get("statusId")
-                    pr = wo.get("priorityId")
-                    lines.append(f"    - WO #{won or wok}: {st}, created {dc}, priority {pr}")
-
-            return "\n".join(lines)
+            return _open_work_orders_text_cached(*signature)
         except Exception:
             return "Unable to compute open work orders right now."
     
     def _build_conversation_history(self, chat) -> str:
         """Build conversation history string from a chat dict."""
         msgs = chat["messages"]
-        if not msgs or len(msgs) < 2:
+        if len(msgs) < 2:
             return "No previous conversation."
         
-        # Get last 10 messages (5 exchanges) to avoid token limits
+        # Get last 10 messages (5 exchanges) to avoid token limits; the slice copies at most 10 references
         recent_messages = msgs[-10:]
         
-        history = ""
-        for message in recent_messages:
-            role = "User" if message["role"] == "user" else "Assistant"
-            history += f"{role}: {message['content']}\n\n"
+        history = [
+            f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}"
+            for message in recent_messages
+        ]
         
-        return history.strip()
+        return "\n\n".join(history).strip()